@@ -32,14 +32,14 @@ import json
 import re
 import sys
 
-# Define validation rules as a list of (regex pattern, message) tuples
+# Define validation rules as a list of (compiled regex, message) tuples
 _VALIDATION_RULES = [
     (
-        r"^grep\b(?!.*\|)",
+        re.compile(r"^grep\b(?!.*\|)"),
         "Use 'rg' (ripgrep) instead of 'grep' for better performance and features",
     ),
     (
-        r"^find\s+\S+\s+-name\b",
+        re.compile(r"^find\s+\S+\s+-name\b"),
         "Use 'rg --files | rg pattern' or 'rg --files -g pattern' instead of 'find -name' for better performance",
     ),
 ]
@@ -48,15 +48,17 @@ _VALIDATION_RULES = [
 def _validate_command(command: str) -> list[str]:
     issues = []
     for pattern, message in _VALIDATION_RULES:
-        if re.search(pattern, command):
+        if pattern.search(command):
             issues.append(message)
     return issues
 
 
 def main():
     try:
-        input_data = json.load(sys.stdin)
-    except json.JSONDecodeError as e:
+        # json.loads accepts bytes, so skip the text-mode decode of stdin.
+        # ValueError covers both JSONDecodeError and a non-UTF-8 payload.
+        input_data = json.loads(sys.stdin.buffer.read())
+    except ValueError as e:
         print(f"Error: Invalid JSON input: {e}", file=sys.stderr)
         # Exit code 1 shows stderr to the user but not to Claude
         sys.exit(1)
@@ -8,7 +8,7 @@ circular import). It must stay free of any other intra-plugin imports.
 import json
 import os
 import threading
-from datetime import datetime
+import time
 
 # Debug log file. Lives under the plugin state dir (default ~/.claude/security/)
 # rather than /tmp because /tmp is world-writable on multi-user hosts (TOCTOU /
@@ -25,30 +25,81 @@ DEBUG_LOG_FILE = os.environ.get("SECURITY_GUIDANCE_DEBUG_LOG") or os.path.join(
 # rotation), so total disk stays ~2× this.
 DEBUG_LOG_MAX_BYTES = 1 * 1024 * 1024
 
+# Set once the log's parent dir is known to exist, so only the first
+# debug_log() call per process pays for the makedirs stat/mkdir.
+_log_dir_ready = False
+# O_APPEND fd kept open across debug_log() calls, plus the (st_dev, st_ino)
+# it was opened on. A path stat per call tells us when the file was rotated
+# or removed (by us or another hook process) and the fd must be reopened.
+# The reviewer threads log concurrently, hence the lock.
+_log_fd = None
+_log_ident = None
+_LOG_LOCK = threading.Lock()
+
 
 def debug_log(message):
     """Append debug message to log file with timestamp."""
+    global _log_dir_ready, _log_fd, _log_ident
     try:
-        # Ensure parent dir exists — first hook invocation on a fresh install
-        # creates ~/.claude/security/ if it isn't already there. 0700 so other
-        # local users can't read review/debug output (only applies on creation).
-        try:
-            os.makedirs(os.path.dirname(DEBUG_LOG_FILE), mode=0o700, exist_ok=True)
-        except OSError:
-            pass
-        try:
-            if os.path.getsize(DEBUG_LOG_FILE) > DEBUG_LOG_MAX_BYTES:
-                # os.replace is atomic on POSIX; under a racing fleet the loser
-                # gets FileNotFoundError, which is fine — the append below
-                # recreates the file.
-                os.replace(DEBUG_LOG_FILE, DEBUG_LOG_FILE + ".1")
-        except OSError:
-            pass
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
-        # 0600 on creation; existing files keep their mode.
-        fd = os.open(DEBUG_LOG_FILE, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o600)
-        with os.fdopen(fd, "a") as f:
-            f.write(f"[{timestamp}] {message}\n")
+        now = time.time()
+        timestamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(now)) + f".{int(now % 1 * 1000):03d}"
+        line = f"[{timestamp}] {message}\n".encode("utf-8", "replace")
+        with _LOG_LOCK:
+            # Ensure parent dir exists — first hook invocation on a fresh install
+            # creates ~/.claude/security/ if it isn't already there. 0700 so other
+            # local users can't read review/debug output (only applies on creation).
+            if not _log_dir_ready:
+                try:
+                    os.makedirs(os.path.dirname(DEBUG_LOG_FILE), mode=0o700, exist_ok=True)
+                    _log_dir_ready = True
+                except OSError:
+                    pass
+            try:
+                st = os.stat(DEBUG_LOG_FILE)
+                ident = (st.st_dev, st.st_ino)
+                if st.st_size > DEBUG_LOG_MAX_BYTES:
+                    # Drop our own fd first: Windows won't rename a file any
+                    # process holds open (os.open doesn't share delete), so a
+                    # cached fd would block rotation for the process lifetime.
+                    # A rename that still fails because another live hook has
+                    # it open is retried on a later call. On POSIX os.replace
+                    # is atomic; under a racing fleet the loser gets
+                    # FileNotFoundError, which is fine — the reopen below
+                    # recreates the file.
+                    ident = None
+                    if _log_fd is not None:
+                        try:
+                            os.close(_log_fd)
+                        except OSError:
+                            pass
+                        _log_fd = None
+                    os.replace(DEBUG_LOG_FILE, DEBUG_LOG_FILE + ".1")
+            except OSError:
+                ident = None
+            if _log_fd is None or ident != _log_ident:
+                if _log_fd is not None:
+                    try:
+                        os.close(_log_fd)
+                    except OSError:
+                        pass
+                    _log_fd = None
+                # 0600 on creation; existing files keep their mode.
+                try:
+                    _log_fd = os.open(DEBUG_LOG_FILE, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o600)
+                except FileNotFoundError:
+                    # The log dir was removed after _log_dir_ready was set
+                    # (state dir wiped mid-session). Recreate it and retry
+                    # once; if that fails too, the next call tries again.
+                    _log_dir_ready = False
+                    os.makedirs(os.path.dirname(DEBUG_LOG_FILE), mode=0o700, exist_ok=True)
+                    _log_dir_ready = True
+                    _log_fd = os.open(DEBUG_LOG_FILE, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o600)
+                st = os.fstat(_log_fd)
+                _log_ident = (st.st_dev, st.st_ino)
+            # One os.write on an O_APPEND fd: no buffered-file wrapper, and
+            # each line lands whole even when parallel hook processes share
+            # the log.
+            os.write(_log_fd, line)
     except Exception:
         pass
 
@@ -584,6 +584,10 @@ def _is_reviewable_source(file_path):
     return False
 
 
+# "a/<old> b/<new>" remainder of a `diff --git` header line.
+_DIFF_HEADER_RE = re.compile(r'^a/(.+?) b/(.+)$')
+
+
 def extract_file_paths_from_diff(diff_output):
     """
     Extract file paths from unified diff output (without content).
@@ -599,8 +603,8 @@ def extract_file_paths_from_diff(diff_output):
     for file_diff in file_diffs:
         if not file_diff.strip():
             continue
-        lines = file_diff.split('\n')
-        header_match = re.match(r'^a/(.+?) b/(.+)$', lines[0])
+        # Only the header line is needed; don't split the whole hunk body.
+        header_match = _DIFF_HEADER_RE.match(file_diff.partition('\n')[0])
         if not header_match:
             continue
         file_path = header_match.group(2) or header_match.group(1) or ''
@@ -628,8 +632,8 @@ def parse_diff_into_files(diff_output):
             continue
 
         # Extract filename from first line: "a/path/to/file b/path/to/file"
-        lines = file_diff.split('\n')
-        header_match = re.match(r'^a/(.+?) b/(.+)$', lines[0])
+        header, _, body = file_diff.partition('\n')
+        header_match = _DIFF_HEADER_RE.match(header)
         if not header_match:
             continue
 
@@ -639,17 +643,16 @@ def parse_diff_into_files(diff_output):
         if not _is_reviewable_source(file_path):
             continue
 
-        # Extract the diff content (from first @@ onwards)
-        diff_lines = []
-        in_hunks = False
-        for line in lines[1:]:
-            if line.startswith('@@'):
-                in_hunks = True
-            if in_hunks:
-                diff_lines.append(line)
-
-        if diff_lines:
-            files.append((file_path, '\n'.join(diff_lines)))
+        # Extract the diff content (from first @@ onwards) as a slice
+        # rather than splitting and rejoining every line of the hunks.
+        if body.startswith('@@'):
+            hunks_start = 0
+        else:
+            hunks_start = body.find('\n@@') + 1
+            if not hunks_start:
+                continue
+
+        files.append((file_path, body[hunks_start:]))
 
     return files
 
@@ -22,7 +22,6 @@ import json
 import os
 import re
 import sys
-import urllib.request
 from typing import Optional, Tuple, Dict, Any, List
 
 import extensibility
@@ -99,10 +98,35 @@ def _anthropic_base_url() -> str:
     return os.environ.get("ANTHROPIC_BASE_URL", "https://api.anthropic.com").rstrip("/")
 
 
+# One TLS context per process. urlopen() without a context has
+# HTTPSConnection build a fresh default context — and re-parse the system CA
+# bundle — for every HTTPS connection, which is a few ms per review call
+# (probe, primary, sonnet fallback, dual_or leg). Created lazily so hook invocations that never
+# make an LLM call don't pay for the CA load at all. Built the same way
+# HTTPSConnection builds its own when none is passed — via the overridable
+# ssl._create_default_https_context hook (PYTHONHTTPSVERIFY, site/corporate
+# overrides), plus http/1.1 ALPN and TLS 1.3 post-handshake auth — so only
+# the caching differs from urlopen's default.
+_ssl_ctx = None
+
+
+def _ssl_context():
+    global _ssl_ctx
+    if _ssl_ctx is None:
+        import ssl
+        ctx = ssl._create_default_https_context()
+        ctx.set_alpn_protocols(["http/1.1"])
+        if ctx.post_handshake_auth is not None:
+            ctx.post_handshake_auth = True
+        _ssl_ctx = ctx
+    return _ssl_ctx
+
+
 def _probe_anthropic(timeout: float = 5.0) -> bool:
+    import urllib.request
     req = urllib.request.Request(_anthropic_base_url() + "/", method="HEAD")
     try:
-        with urllib.request.urlopen(req, timeout=timeout):
+        with urllib.request.urlopen(req, timeout=timeout, context=_ssl_context()):
             return True
     except urllib.error.HTTPError:
         return True  # got a status code → connected
@@ -193,6 +217,8 @@ def _build_auth_headers(use_token):
     headers = {
         "Content-Type": "application/json",
         "anthropic-version": "2023-06-01",
+        # urllib doesn't negotiate compression on its own; _read_body inflates.
+        "Accept-Encoding": "gzip",
     }
     if use_token:
         headers["Authorization"] = f"Bearer {ANTHROPIC_AUTH_TOKEN}"
@@ -203,6 +229,30 @@ def _build_auth_headers(use_token):
     return headers
 
 
+class _BodyDecodeError(ValueError):
+    """A response body labeled gzip that failed to inflate."""
+
+
+def _read_body(resp):
+    """Read an HTTP response (or HTTPError) body as text, inflating gzip.
+
+    Review responses carry thinking blocks plus the findings JSON and
+    routinely run to tens of KB; gzip cuts that several-fold on the wire.
+    Gateways are free to ignore Accept-Encoding, so only inflate when the
+    server says it compressed. A truncated or mislabeled body raises
+    _BodyDecodeError rather than gzip's assorted OSError/EOFError/zlib.error.
+    """
+    data = resp.read()
+    if (resp.headers.get("Content-Encoding") or "").strip().lower() == "gzip":
+        import gzip
+        import zlib
+        try:
+            data = gzip.decompress(data)
+        except (OSError, EOFError, zlib.error) as e:
+            raise _BodyDecodeError(f"gzip body failed to inflate: {e}") from e
+    return data.decode("utf-8")
+
+
 # Models that require the adaptive thinking API (4.6 and later). Older models
 # require the legacy budget_tokens form. Sending the wrong one returns a 400.
 # Mirrors Claude Code's adaptive-thinking model support; keep in sync
@@ -383,6 +433,30 @@ def _call_claude_via_sdk(prompt, output_schema, *, max_tokens=16000, model=None)
         return None
 
 
+# Upper bound on a server-supplied Retry-After. The Stop/commit hooks run
+# under asyncRewake, so a long sleep delays findings rather than blocking the
+# user, but a misbehaving gateway shouldn't be able to park the hook forever.
+_RETRY_AFTER_CAP_S = 30.0
+
+
+def _retry_wait(attempt, base, retry_after=None):
+    """Seconds to sleep before retry `attempt` (0-based).
+
+    Honors a numeric Retry-After header (capped at _RETRY_AFTER_CAP_S) when
+    the server sends one. Otherwise keeps the linear `(attempt + 1) * base`
+    schedule, scaled by a 0.5–1.5× jitter so parallel legs (dual_or, the
+    agentic race fallback, a fleet of workers sharing one key) that hit the
+    same 429/529 don't retry in lockstep and collide again.
+    """
+    if retry_after:
+        try:
+            return min(max(float(retry_after), 0.0), _RETRY_AFTER_CAP_S)
+        except (TypeError, ValueError):
+            pass  # HTTP-date form or junk — fall through to jittered backoff
+    import random as _random
+    return (attempt + 1) * base * _random.uniform(0.5, 1.5)
+
+
 def _call_claude(prompt, output_schema, thinking_budget=10000, max_tokens=16000, model=None,
                  retry_5xx=True):
     """
@@ -393,7 +467,7 @@ def _call_claude(prompt, output_schema, thinking_budget=10000, max_tokens=16000,
     (or -1 for network/timeout) so callers can distinguish API failure from an
     empty-result success.
 
-    retry_5xx=False: 5xx (500/502/503/529) returns None immediately so a model
+    retry_5xx=False: 5xx (500/502/503/504/529) returns None immediately so a model
     chain can fall through fast instead of paying ~6s of backoff before trying
     the next model. 429 still retries regardless — that's a per-key throttle a
     different model won't help with.
@@ -416,6 +490,7 @@ def _call_claude(prompt, output_schema, thinking_budget=10000, max_tokens=16000,
 
     global _auth_prefer_token
     import time as _time
+    import urllib.request
 
     api_url = _anthropic_base_url() + "/v1/messages"
     use_token = _auth_prefer_token or not ANTHROPIC_API_KEY
@@ -444,17 +519,27 @@ def _call_claude(prompt, output_schema, thinking_budget=10000, max_tokens=16000,
                 "budget_tokens": thinking_budget,
             }
 
+    # Serialize once: the payload is identical across retries (only headers
+    # change on the 401→token fallback).
+    body = json.dumps(payload).encode("utf-8")
     response_data = None
     for attempt in range(3):
         try:
             request = urllib.request.Request(
                 api_url,
-                data=json.dumps(payload).encode("utf-8"),
+                data=body,
                 headers=headers,
                 method="POST",
             )
-            with urllib.request.urlopen(request, timeout=120) as response:
-                response_body = response.read().decode("utf-8")
+            with urllib.request.urlopen(request, timeout=120,
+                                        context=_ssl_context()) as response:
+                try:
+                    response_body = _read_body(response)
+                except _BodyDecodeError as e:
+                    # Unreadable 200 body — same outcome as a failed request.
+                    debug_log(f"API response unreadable: {e}")
+                    _last_call_claude_http_error = -1
+                    return None
                 response_data = json.loads(response_body)
             _record_usage(response_data.get("usage") or {},
                           response_data.get("model") or payload["model"])
@@ -466,20 +551,26 @@ def _call_claude(prompt, output_schema, thinking_budget=10000, max_tokens=16000,
                 _auth_prefer_token = True
                 headers = _build_auth_headers(use_token)
                 continue
-            retryable = e.code == 429 or (retry_5xx and e.code in (500, 502, 503, 529))
+            retryable = e.code == 429 or (retry_5xx and e.code in (500, 502, 503, 504, 529))
             if retryable and attempt < 2:
-                wait = (attempt + 1) * 5 if e.code == 429 else (attempt + 1) * 2
-                debug_log(f"API {e.code}, retrying in {wait}s (attempt {attempt+1})")
+                wait = _retry_wait(attempt, 5 if e.code == 429 else 2,
+                                   e.headers.get("retry-after") if e.headers else None)
+                debug_log(f"API {e.code}, retrying in {wait:.1f}s (attempt {attempt+1})")
                 _time.sleep(wait)
             else:
-                error_body = e.read().decode("utf-8") if e.fp else ""
+                # Body is only for the log line; never let a bad one
+                # (mislabeled gzip, reset mid-read) mask the status code.
+                try:
+                    error_body = _read_body(e) if e.fp else ""
+                except (OSError, ValueError):
+                    error_body = ""
                 debug_log(f"API error: {e.code} - {error_body[:200]}")
                 _last_call_claude_http_error = e.code
                 return None
         except (urllib.error.URLError, TimeoutError) as e:
             if attempt < 2:
-                wait = (attempt + 1) * 3
-                debug_log(f"Request failed, retrying in {wait}s: {e}")
+                wait = _retry_wait(attempt, 3)
+                debug_log(f"Request failed, retrying in {wait:.1f}s: {e}")
                 _time.sleep(wait)
             else:
                 debug_log(f"Request failed after retries: {e}")
@@ -1056,6 +1147,11 @@ def _agentic_spawn_env() -> Dict[str, str]:
     return env
 
 
+# Collapses whitespace runs when pass-1 findings are embedded in pass-2's
+# exclusion block (agentic_review._scrub).
+_WHITESPACE_RUN_RE = re.compile(r"\s+")
+
+
 def agentic_review(
     repo_dir: str, diff_files: List[Tuple[str, str]], touched_paths: List[str],
 ) -> Tuple[Optional[str], List[Dict[str, Any]], Dict[str, Any]]:
@@ -1337,7 +1433,7 @@ def agentic_review(
         # as data when embedding into pass-2's prompt: collapse newlines and
         # wrap in a delimited block the model is told to read as data only.
         def _scrub(s: object) -> str:
-            cleaned = re.sub(r"\s+", " ", str(s or "")).strip()[:120]
+            cleaned = _WHITESPACE_RUN_RE.sub(" ", str(s or "")).strip()[:120]
             return (cleaned.replace("&", "&amp;")
                            .replace("<", "&lt;")
                            .replace(">", "&gt;"))
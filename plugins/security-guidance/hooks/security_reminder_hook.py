@@ -57,16 +57,14 @@ try:
 except ImportError:
     fcntl = None
 import contextlib
+import functools
 import glob
 import json
 import os
-import random
 import re
 import subprocess
 import sys
 import threading
-import urllib.request
-from datetime import datetime
 from enum import IntEnum
 from typing import Optional, Tuple, Dict, Any, List
 
@@ -75,7 +73,14 @@ from typing import Optional, Tuple, Dict, Any, List
 # import review_api directly so they run the same eval-covered prompts
 # without going through the CC hook protocol.  The underscored names below
 # alias into it so this script stays the single CC-hook entrypoint.
-sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+# When run as a script (the hooks.json path) this dir is already sys.path[0];
+# only prepend it when imported from elsewhere (harnesses, tests) so every
+# subsequent import doesn't probe the same directory twice. Checks the head,
+# not mere membership: sibling modules like `llm` must still shadow any
+# same-named installed package.
+_HOOKS_DIR = os.path.dirname(os.path.abspath(__file__))
+if sys.path[:1] != [_HOOKS_DIR]:
+    sys.path.insert(0, _HOOKS_DIR)
 import review_api  # noqa: E402
 from _base import (  # noqa: E402,F401
     DEBUG_LOG_FILE, DEBUG_LOG_MAX_BYTES, debug_log,
@@ -181,6 +186,10 @@ MAX_STOP_HOOK_FIRINGS = int(os.environ.get("MAX_STOP_HOOK_FIRINGS", "3"))
 # diff; unbounded diffs burn tokens and risk 400 on context length.
 MAX_DIFF_FILES = int(os.environ.get("MAX_DIFF_FILES", "30"))
 
+# PostToolUse tools whose output runs through the pattern rules. Must stay in
+# sync with the Edit|Write|MultiEdit|NotebookEdit matcher in hooks.json.
+_FILE_EDIT_TOOLS = frozenset({"Edit", "Write", "MultiEdit", "NotebookEdit"})
+
 # Appended to all exit(2) guidance so the asyncRewake auto-turn doesn't
 # cause the model to abandon the user's original request.
 CONTINUATION_SUFFIX = (
@@ -234,6 +243,18 @@ def emit_metrics(metrics, rewake_summary=None):
 # get_lock_file, cleanup_old_state_files, load_state, save_state,
 # with_locked_state) moved to session_state.py and re-exported above.
 
+def _warning_key(file_path, rule_name):
+    """shown_warnings key for a pattern rule firing on a file."""
+    return f"{file_path}-{rule_name}"
+
+def _mark_warning_shown(state, warning_key):
+    """Add warning_key to shown_warnings; True if it wasn't there yet."""
+    warnings = state["shown_warnings"]
+    if warning_key in warnings:
+        return False
+    warnings.append(warning_key)
+    return True
+
 def atomic_check_and_mark_warning(session_id, warning_key):
     """
     Atomically check if a warning has been shown and mark it as shown if not.
@@ -241,11 +262,7 @@ def atomic_check_and_mark_warning(session_id, warning_key):
     False if it was already shown (should skip it).
     """
     def _check(state):
-        warnings = state["shown_warnings"]
-        if warning_key in warnings:
-            return False
-        warnings.append(warning_key)
-        return True
+        return _mark_warning_shown(state, warning_key)
 
     result = with_locked_state(session_id, _check)
     return result if result is not None else True
@@ -318,17 +335,39 @@ def atomic_check_rate_limit(session_id, key, max_per_window, window_s):
 # State key: pending_warnings: {"<file>:<rule>": true}
 # =====================================================================
 
+def _record_pending(state, file_path, rule_names):
+    """Add file:rule entries to pending_warnings, repairing a bad value."""
+    pending = state.get("pending_warnings")
+    if not isinstance(pending, dict):
+        pending = {}
+        state["pending_warnings"] = pending
+    for rule in rule_names:
+        pending[f"{file_path}:{rule}"] = True
+
 def record_pending_warnings(session_id, file_path, rule_names):
     """Mark file:rule pairs as pending for the Stop-hook outcome sweep."""
     def _record(state):
-        pending = state.get("pending_warnings")
-        if not isinstance(pending, dict):
-            pending = {}
-            state["pending_warnings"] = pending
-        for rule in rule_names:
-            pending[f"{file_path}:{rule}"] = True
+        _record_pending(state, file_path, rule_names)
     with_locked_state(session_id, _record)
 
+def mark_pattern_warnings(session_id, file_path, rule_names):
+    """Dedup and record pattern warnings for one edit in a single state cycle.
+
+    Equivalent to calling atomic_check_and_mark_warning for each rule and
+    then record_pending_warnings, but takes the lock and rewrites the state
+    file once instead of len(rule_names) + 1 times. Returns the subset of
+    rule_names whose warning has not been shown before in this session.
+    """
+    def _mark(state):
+        fresh = [rule for rule in rule_names
+                 if _mark_warning_shown(state, _warning_key(file_path, rule))]
+        _record_pending(state, file_path, rule_names)
+        return fresh
+
+    result = with_locked_state(session_id, _mark)
+    # State unavailable → fail-open, show everything.
+    return result if result is not None else list(rule_names)
+
 def sweep_pending_warnings(session_id):
     """
     Stop-hook final sweep. Re-read every file in pending_warnings, re-check
@@ -383,6 +422,18 @@ def sweep_pending_warnings(session_id):
 # Pattern matching
 # =====================================================================
 
+@functools.lru_cache(maxsize=None)
+def _compile_rule_regex(regex):
+    """Compile a SECURITY_PATTERNS / user-pattern regex once per process.
+
+    check_patterns runs every rule against the edit, then again against the
+    Write baseline and once per file in the Stop sweep; keying on the source
+    string covers built-in and user rules alike without mutating the rule
+    dicts that extensibility hands back.
+    """
+    return re.compile(regex)
+
+
 def check_patterns(file_path, content):
     """Check if file path or content matches any security patterns. Returns ALL matches."""
     normalized_path = file_path.lstrip("/")
@@ -416,7 +467,7 @@ def check_patterns(file_path, content):
 
         if not matched and "regex" in pattern and content:
             try:
-                if re.search(pattern["regex"], content):
+                if _compile_rule_regex(pattern["regex"]).search(content):
                     matched = True
             except Exception:
                 pass
@@ -575,12 +626,12 @@ def _resolve_amend_pre_sha(repo_root, expected_post_sha=None):
 # git-only signals that corroborate a real commit object — NOT emitted by
 # pre-commit / lint-staged / husky hook output, which can contain bracketed
 # labels like `[pre-commit abc1234]` that otherwise look like a commit line.
-_COMMIT_DIFFSTAT_PATTERNS = [
-    re.compile(r'\b\d+ files? changed'),
-    re.compile(r'^ create mode ', re.MULTILINE),
-    re.compile(r'^ delete mode ', re.MULTILINE),
-    re.compile(r'^ rename ', re.MULTILINE),
-]
+# One alternation so the (possibly long, hook-noisy) Bash output is scanned
+# once rather than once per signal.
+_COMMIT_DIFFSTAT_RE = re.compile(
+    r'\b\d+ files? changed|^ (?:create mode|delete mode|rename) ',
+    re.MULTILINE,
+)
 
 # Capture-group form of the [branch sha] pattern. Mirrors Claude Code's own
 # commit-id parsing, but tolerates spaces before the
@@ -639,6 +690,10 @@ _PUSH_RANGE_RE = re.compile(
     re.MULTILINE,
 )
 
+_TOOL_USE_ID_UNSAFE_RE = re.compile(r"[^A-Za-z0-9_-]")
+_PUSH_NEW_BRANCH_RE = re.compile(
+    r"^\s*\*\s+\[new branch\]\s+(\S+)\s+->\s+\S+", re.MULTILINE)
+
 MAX_PUSH_SWEEP_FILES = int(os.environ.get("SG_PUSH_SWEEP_MAX_FILES", "30"))
 MAX_PUSH_SWEEP_RANGE = int(os.environ.get("SG_PUSH_SWEEP_MAX_RANGE", "50"))
 PUSH_SWEEP_REPORT_CAP = int(os.environ.get("SG_PUSH_SWEEP_REPORT_CAP", "3"))
@@ -670,19 +725,19 @@ def _claim_bash_hook_once(input_data):
     import time as _time
     now = _time.time()
     try:
-        for name in os.listdir(gd):
-            if name.startswith("sg-hook-once-"):
-                p = os.path.join(gd, name)
-                try:
-                    if now - os.path.getmtime(p) > 300:
-                        os.unlink(p)
-                except OSError:
-                    pass
+        with os.scandir(gd) as entries:
+            for entry in entries:
+                if entry.name.startswith("sg-hook-once-"):
+                    try:
+                        if now - entry.stat().st_mtime > 300:
+                            os.unlink(entry.path)
+                    except OSError:
+                        pass
     except OSError:
         pass
     # Sanitize tuid into a filesystem-safe basename — defensive, the value is
     # CC-generated (toolu_<b64ish>), but it ends up in a path.
-    safe = re.sub(r"[^A-Za-z0-9_-]", "_", tuid)[:80]
+    safe = _TOOL_USE_ID_UNSAFE_RE.sub("_", tuid)[:80]
     sentinel = os.path.join(gd, f"sg-hook-once-{safe}")
     try:
         fd = os.open(sentinel, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
@@ -941,7 +996,7 @@ def handle_commit_review_posttooluse(input_data):
     commit_succeeded = (
         not interrupted
         and _COMMIT_SHA_RE.search(bash_output) is not None
-        and any(p.search(bash_output) for p in _COMMIT_DIFFSTAT_PATTERNS)
+        and _COMMIT_DIFFSTAT_RE.search(bash_output) is not None
     )
 
     # commit_review_on emitted on every path so telemetry can filter on
@@ -1473,9 +1528,7 @@ def handle_push_sweep_posttooluse(input_data):
     elif head:
         # No range lines. Need a positive push-success signal — otherwise
         # the push may have failed and we'd review unpushed local commits.
-        new_branch_matches = re.findall(
-            r"^\s*\*\s+\[new branch\]\s+(\S+)\s+->\s+\S+",
-            push_section, re.M)
+        new_branch_matches = _PUSH_NEW_BRANCH_RE.findall(push_section)
         up_to_date = "Everything up-to-date" in push_section
         # `git push -q` suppresses all output on success. Distinguish quiet-
         # success from a failed push (which has error text) by checking the
@@ -2028,15 +2081,12 @@ def main():
         emit_metrics({"skipped": True, "skip_reason": -1})
         sys.exit(0)
 
-    # Periodically clean up old state files (10% chance per run)
-    if random.random() < 0.1:
-        cleanup_old_state_files()
-
-    # Read input from stdin
+    # Read input from stdin as bytes — json.loads detects the encoding itself,
+    # so the TextIOWrapper decode pass is skipped. ValueError also covers
+    # UnicodeDecodeError on a malformed payload, not just JSONDecodeError.
     try:
-        raw_input = sys.stdin.read()
-        input_data = json.loads(raw_input)
-    except json.JSONDecodeError as e:
+        input_data = json.loads(sys.stdin.buffer.read())
+    except ValueError as e:
         debug_log(f"JSON decode error: {e}")
         emit_metrics({"skipped": True, "skip_reason": -2})
         sys.exit(0)
@@ -2047,6 +2097,24 @@ def main():
     hook_event_name = input_data.get("hook_event_name", "")
     debug_log(f"Processing: hook_event={hook_event_name}, tool={tool_name}")
 
+    # Fast path: PostToolUse calls this hook has no work for exit before the
+    # cleanup sweep, config reads and SDK bootstrap below. hooks.json
+    # matchers normally keep these from spawning us at all; this covers
+    # broader matchers and `if` filters that let a non-git command through.
+    # Both Bash routing regexes require a literal "git", so a command
+    # without it can skip them entirely.
+    if hook_event_name == "PostToolUse":
+        if tool_name == "Bash":
+            if "git" not in ((tool_input or {}).get("command", "") or ""):
+                return
+        elif tool_name not in _FILE_EDIT_TOOLS:
+            return
+
+    # Periodically clean up old state files (~10% chance per run: 26/256).
+    # One byte from os.urandom avoids importing/seeding `random` per spawn.
+    if os.urandom(1)[0] < 26:
+        cleanup_old_state_files()
+
     # Load project-specific security guidance and custom patterns once
     # per invocation. Failures are non-fatal (debug-logged) so a malformed
     # config never prevents the built-in checks from running.
@@ -2093,8 +2161,12 @@ def main():
     # push sees it as reviewed and the sweep base advances past it. Older
     # unreviewed commits in the range are caught on that next push.
     if tool_name == "Bash" and hook_event_name == "PostToolUse":
-        cmd = (input_data.get("tool_input") or {}).get("command", "") or ""
-        if not (_GIT_COMMIT_RE.search(cmd) or _GIT_PUSH_RE.search(cmd)):
+        cmd = (tool_input or {}).get("command", "") or ""
+        # The "git" substring prescreen ran in the fast path above. Each
+        # regex runs at most once; the results are reused for routing below.
+        is_commit = _GIT_COMMIT_RE.search(cmd) is not None
+        is_push = not is_commit and _GIT_PUSH_RE.search(cmd) is not None
+        if not (is_commit or is_push):
             return
         if not _claim_bash_hook_once(input_data):
             # Another spawn for this same tool_use_id already claimed the
@@ -2102,14 +2174,14 @@ def main():
             # metric so telemetry can count how often the de-dupe kicks in.
             print(json.dumps({"metrics": {"bash_hook_dedup": True}}), flush=True)
             sys.exit(0)
-        if _GIT_COMMIT_RE.search(cmd):
+        if is_commit:
             handle_commit_review_posttooluse(input_data)
-        elif _GIT_PUSH_RE.search(cmd):
+        else:
             handle_push_sweep_posttooluse(input_data)
         return
 
     # Handle PostToolUse — pattern-based checks only (no LLM review per-edit)
-    if tool_name in ["Edit", "Write", "MultiEdit", "NotebookEdit"]:
+    if tool_name in _FILE_EDIT_TOOLS:
         file_path = tool_input.get("file_path") or tool_input.get("notebook_path") or ""
         if not file_path:
             sys.exit(0)
@@ -2144,16 +2216,15 @@ def main():
                     else:
                         debug_log("All patterns existed in baseline, skipping")
 
-            for rule_name, reminder in pattern_matches:
-                warning_key = f"{file_path}-{rule_name}"
-                if atomic_check_and_mark_warning(session_id, warning_key):
-                    all_guidance.append(reminder)
-
-            # Record matched rules as pending so the Stop-hook sweep can
-            # later tally fixed vs unresolved. Only runs when patterns match.
+            # Dedup against shown warnings and record matched rules as
+            # pending (so the Stop-hook sweep can later tally fixed vs
+            # unresolved) in one locked state cycle. Only runs when
+            # patterns match.
             if pattern_matches:
-                record_pending_warnings(session_id, file_path,
-                                        [r for r, _ in pattern_matches])
+                fresh = set(mark_pattern_warnings(
+                    session_id, file_path, [r for r, _ in pattern_matches]))
+                all_guidance = [reminder for rule_name, reminder in pattern_matches
+                                if rule_name in fresh]
 
         # Emit metrics when raw patterns matched (even if all were baseline-suppressed
         # or dedup'd — pattern_hits reflects warnings actually shown, may be 0).
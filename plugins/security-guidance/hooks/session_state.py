@@ -17,11 +17,15 @@ except ImportError:
 import json
 import os
 import re
-from datetime import datetime
+import threading
+import time
 
 from _base import debug_log
 
 
+_STATE_KEY_UNSAFE_RE = re.compile(r"[^A-Za-z0-9._-]")
+
+
 def _state_key(session_id):
     # In CCR each user turn is a new CC process with a fresh session_id; the
     # remote session ID is stable across those restarts. Prefer it so the
@@ -31,7 +35,7 @@ def _state_key(session_id):
     # are UUIDs (sanitization is a no-op for them), but nothing in the hook
     # protocol guarantees that, so strip path separators and anything else
     # that could escape the state dir, and bound the length.
-    return re.sub(r"[^A-Za-z0-9._-]", "_", str(key))[:128]
+    return _STATE_KEY_UNSAFE_RE.sub("_", str(key))[:128]
 
 
 def get_state_file(session_id):
@@ -47,40 +51,43 @@ def get_lock_file(session_id):
 
 
 def cleanup_old_state_files():
-    """Remove state files and lock files older than 30 days."""
+    """Remove state, lock, and orphaned temp files older than 30 days."""
     try:
         state_dir = os.environ.get("SECURITY_WARNINGS_STATE_DIR", os.path.expanduser("~/.claude/security"))
         if not os.path.exists(state_dir):
             return
 
-        current_time = datetime.now().timestamp()
+        current_time = time.time()
         thirty_days_ago = current_time - (30 * 24 * 60 * 60)
 
-        for filename in os.listdir(state_dir):
-            if filename.startswith("security_warnings_state_") and (
-                filename.endswith(".json") or filename.endswith(".lock")
-            ):
-                file_path = os.path.join(state_dir, filename)
-                try:
-                    file_mtime = os.path.getmtime(file_path)
-                    if file_mtime < thirty_days_ago:
-                        os.remove(file_path)
-                except (OSError, IOError):
-                    pass
+        # scandir: names are filtered before any stat, and on Windows the
+        # mtime comes back with the directory listing itself.
+        with os.scandir(state_dir) as entries:
+            for entry in entries:
+                name = entry.name
+                if name.startswith("security_warnings_state_") and name.endswith(
+                    (".json", ".lock", ".tmp")
+                ):
+                    try:
+                        if entry.stat().st_mtime < thirty_days_ago:
+                            os.remove(entry.path)
+                    except (OSError, IOError):
+                        pass
 
         # Sweep legacy lock files left at ~/.claude/ root by versions
         # <1.1.66, where get_lock_file() didn't honor state_dir. Same
         # 30-day mtime gate as above so we don't race an older
         # concurrent peer that may still hold an active lock.
         legacy_dir = os.path.expanduser("~/.claude")
-        for filename in os.listdir(legacy_dir):
-            if filename.startswith("security_warnings_state_") and filename.endswith(".lock"):
-                file_path = os.path.join(legacy_dir, filename)
-                try:
-                    if os.path.getmtime(file_path) < thirty_days_ago:
-                        os.remove(file_path)
-                except (OSError, IOError):
-                    pass
+        with os.scandir(legacy_dir) as entries:
+            for entry in entries:
+                name = entry.name
+                if name.startswith("security_warnings_state_") and name.endswith(".lock"):
+                    try:
+                        if entry.stat().st_mtime < thirty_days_ago:
+                            os.remove(entry.path)
+                    except (OSError, IOError):
+                        pass
     except Exception:
         pass
 
@@ -109,17 +116,52 @@ def save_state(session_id, state):
         if state_dir:
             os.makedirs(state_dir, exist_ok=True)
 
-        with open(state_file, "w") as f:
-            json.dump(state, f)
+        # Write-then-rename so a hook killed mid-write (CC timeout, Ctrl-C)
+        # can't leave truncated JSON behind — load_state would silently reset
+        # it to empty and drop baseline_sha/touched_paths. No fsync: the state
+        # is advisory and a lost write after power loss only costs a re-warn.
+        # pid + thread id: the reviewer threads of one process can save
+        # concurrently on the unlocked (no-fcntl) path and must not share a
+        # temp file.
+        tmp_file = f"{state_file}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_file, "w") as f:
+                json.dump(state, f)
+            try:
+                os.replace(tmp_file, state_file)
+            except PermissionError:
+                # Windows refuses to replace a file another hook process has
+                # open for reading. Fall back to the in-place write this
+                # used before, rather than dropping the update.
+                with open(state_file, "w") as f:
+                    json.dump(state, f)
+                os.remove(tmp_file)
+        except BaseException:
+            try:
+                os.remove(tmp_file)
+            except OSError:
+                pass
+            raise
     except (IOError, OSError) as e:
         debug_log(f"Failed to save state file {state_file}: {e}")
 
 
+def _snapshot(state):
+    """Serialized form used to detect whether a callback changed the state.
+    Falls back to a sentinel that never compares equal, so an unserializable
+    state still goes through save_state (and its error handling)."""
+    try:
+        return json.dumps(state)
+    except (TypeError, ValueError):
+        return object()
+
+
 def with_locked_state(session_id, callback):
     """
     Execute callback with exclusive access to the state file.
     The callback receives the state dict and can modify it in place.
-    State is saved after the callback returns.
+    State is saved after the callback returns, unless the callback left it
+    unchanged (e.g. a warning that was already shown, a read-only lookup).
     Returns the callback's return value.
     """
     lock_file = get_lock_file(session_id)
@@ -133,8 +175,10 @@ def with_locked_state(session_id, callback):
     if fcntl is None:
         # No file locking available (Windows) — run without locking
         state = load_state(session_id)
+        before = _snapshot(state)
         result = callback(state)
-        save_state(session_id, state)
+        if _snapshot(state) != before:
+            save_state(session_id, state)
         return result
 
     lock_fd = None
@@ -143,8 +187,10 @@ def with_locked_state(session_id, callback):
         fcntl.flock(lock_fd, fcntl.LOCK_EX)
 
         state = load_state(session_id)
+        before = _snapshot(state)
         result = callback(state)
-        save_state(session_id, state)
+        if _snapshot(state) != before:
+            save_state(session_id, state)
         return result
 
     except (OSError, IOError) as e: